@@ -6,7 +6,10 @@ This script extracts and summarizes information from Claude Code's native sessio
 and creates a human-readable markdown summary in the inverted pyramid format.
 
 Usage:
-    python scripts/generate-summary.py
+    python scripts/generate-summary.py [--full-narrative] [--max-narrative-messages N]
+
+By default the Full Narrative section holds only the last 50 user and 50
+assistant messages; pass --full-narrative to include the whole session.
 
 The script will:
 1. Find the current project directory
@@ -16,12 +19,36 @@ The script will:
 5. Update .context/session-latest.md symlink
 """
 
+import argparse
 import json
+import mmap
 import os
+import re
+import string
 import sys
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from itertools import islice, zip_longest
+from typing import List, Dict, Any, Iterator, Optional
+
+# orjson is optional; it parses bytes directly and is several times faster
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Translation table mapping / to - for Claude Code project directory names
+_SLASH_TO_DASH = str.maketrans({'/': '-'})
+
+# Keywords that mark an assistant message as recording a decision
+_DECISION_RE = re.compile(r'\b(?:chose|decided|selected|using|rejected)\b', re.IGNORECASE)
+
+# Assistant messages longer than this are truncated in the narrative
+NARRATIVE_MAX_CHARS = 500
+
+# User and assistant messages each kept in the narrative unless --full-narrative is given
+NARRATIVE_DEFAULT_MESSAGES = 50
 
 def get_project_directory() -> str:
     """Get current working directory as absolute path."""
@@ -35,51 +62,83 @@ def get_claude_project_name(project_dir: str) -> str:
           -> -Users-jonathanwells-code-jmw-superclaude
     """
     # Replace all / with -
-    claude_name = project_dir.replace('/', '-')
-    return claude_name
+    return project_dir.translate(_SLASH_TO_DASH)
 
 def find_latest_session_log(project_dir: str) -> Optional[Path]:
     """
     Find the most recent session log file for the current project.
 
+    Paths are handled as plain strings internally; only the result is a Path.
+
     Returns:
         Path to session log file, or None if not found
     """
-    claude_dir = Path.home() / '.claude' / 'projects'
     claude_project_name = get_claude_project_name(project_dir)
-    project_log_dir = claude_dir / claude_project_name
+    project_log_dir = os.path.join(
+        os.path.expanduser('~'), '.claude', 'projects', claude_project_name
+    )
 
-    if not project_log_dir.exists():
+    if not os.path.exists(project_log_dir):
         print(f"No Claude Code session directory found: {project_log_dir}", file=sys.stderr)
         return None
 
-    # Find all .jsonl files
-    session_files = list(project_log_dir.glob('*.jsonl'))
-
-    if not session_files:
+    # Find the most recently modified .jsonl file. DirEntry caches its type
+    # and stat result, so each entry costs at most one stat call.
+    with os.scandir(project_log_dir) as entries:
+        latest = max(
+            ((entry.name, entry.stat().st_mtime) for entry in entries
+             if entry.name.endswith('.jsonl') and entry.is_file()),
+            key=lambda item: item[1],
+            default=None,
+        )
+
+    if latest is None:
         print(f"No session logs found in: {project_log_dir}", file=sys.stderr)
         return None
 
-    # Return most recently modified
-    latest = max(session_files, key=lambda p: p.stat().st_mtime)
-    return latest
+    return Path(project_log_dir, latest[0])
+
+def _iter_lines(mm: mmap.mmap) -> Iterator[bytes]:
+    """Yield each line of a memory-mapped log as bytes, without its newline."""
+    start = 0
+    find = mm.find
+    end = find(b'\n', start)
+    while end != -1:
+        yield mm[start:end]
+        start = end + 1
+        end = find(b'\n', start)
+
+    # Last line may not be newline-terminated
+    yield mm[start:]
 
 def parse_session_log(log_file: Path) -> List[Dict[str, Any]]:
     """
     Parse JSONL session log file.
 
     Each line is a JSON object representing an event in the session.
+    The file is memory-mapped and lines are sliced out as bytes, so the
+    log is never decoded or copied into a single str.
     """
     events = []
-    with open(log_file, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                try:
-                    events.append(json.loads(line))
-                except json.JSONDecodeError as e:
-                    print(f"Warning: Failed to parse line: {e}", file=sys.stderr)
-                    continue
+
+    # mmap cannot map an empty file
+    if os.path.getsize(log_file) == 0:
+        return events
+
+    with open(log_file, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # Lines stay bytes all the way into the loader: orjson parses UTF-8
+        # natively and json.loads accepts bytes, so no str is built here.
+        # isspace() skips blank lines without the copy strip() would make.
+        for line in _iter_lines(mm):
+            if not line or line.isspace():
+                continue
+            try:
+                events.append(_loads(line))
+            except (json.JSONDecodeError, ValueError) as e:
+                # orjson.JSONDecodeError and UnicodeDecodeError subclass ValueError
+                print(f"Warning: Failed to parse line: {e}", file=sys.stderr)
+
     return events
 
 def extract_summary_data(events: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -90,150 +149,174 @@ def extract_summary_data(events: List[Dict[str, Any]]) -> Dict[str, Any]:
         - user_messages: List of user prompts
         - assistant_messages: List of assistant responses
         - tool_uses: List of tools used
-        - errors: List of errors encountered
-        - decisions: Extracted decisions and reasoning
+        - tool_results_count: Number of tool results
+        - errors_count: Number of tool results flagged as errors
+
+    Tool result payloads can be large (file contents, command output) and
+    are never displayed, so only their counts are kept.
     """
     data = {
         'user_messages': [],
         'assistant_messages': [],
         'tool_uses': [],
-        'tool_results': [],
-        'errors': []
+        'tool_results_count': 0,
+        'errors_count': 0
     }
 
+    # Bind list appends once, outside the hot loop
+    user_app = data['user_messages'].append
+    asst_app = data['assistant_messages'].append
+    tool_app = data['tool_uses'].append
+    tool_results_count = 0
+    errors_count = 0
+
+    # Content is JSON-decoded, so it is always a concrete str/list/dict and
+    # never a subclass; exact type checks are used instead of isinstance
     for event in events:
-        if not isinstance(event, dict):
+        if type(event) is not dict:
             continue
 
         # Handle nested message format (actual Claude Code log structure)
         # Events have: {"message": {"role": "...", "content": [...]}, "type": "user"|"assistant", ...}
         msg = event.get('message', event)  # Fall back to event itself for flat format
         role = msg.get('role')
-        content = msg.get('content', '')
 
         # User messages
         if role == 'user':
-            if isinstance(content, str):
-                data['user_messages'].append(content)
-            elif isinstance(content, list):
+            content = msg.get('content', '')
+            content_type = type(content)
+            if content_type is str:
+                user_app(content)
+            elif content_type is list:
                 for item in content:
-                    if isinstance(item, dict) and item.get('type') == 'text':
-                        data['user_messages'].append(item.get('text', ''))
-                    elif isinstance(item, str):
-                        data['user_messages'].append(item)
+                    item_type = type(item)
+                    if item_type is dict:
+                        if item.get('type') == 'text':
+                            user_app(item.get('text', ''))
+                    elif item_type is str:
+                        user_app(item)
 
         # Assistant messages
         elif role == 'assistant':
-            if isinstance(content, str):
-                data['assistant_messages'].append(content)
-            elif isinstance(content, list):
+            content = msg.get('content', '')
+            content_type = type(content)
+            if content_type is str:
+                asst_app(content)
+            elif content_type is list:
                 for item in content:
-                    if isinstance(item, dict):
-                        if item.get('type') == 'text':
-                            data['assistant_messages'].append(item.get('text', ''))
-                        elif item.get('type') == 'tool_use':
-                            data['tool_uses'].append({
+                    if type(item) is dict:
+                        item_type = item.get('type')
+                        if item_type == 'text':
+                            asst_app(item.get('text', ''))
+                        elif item_type == 'tool_use':
+                            tool_app({
                                 'name': item.get('name'),
                                 'input': item.get('input')
                             })
 
         # Tool results (can be at event level)
         if event.get('type') == 'tool_result':
-            result = {
-                'tool_use_id': event.get('tool_use_id'),
-                'content': event.get('content')
-            }
+            tool_results_count += 1
             if event.get('is_error'):
-                data['errors'].append(result)
-            data['tool_results'].append(result)
+                errors_count += 1
 
+    data['tool_results_count'] = tool_results_count
+    data['errors_count'] = errors_count
     return data
 
-def generate_current_state(data: Dict[str, Any]) -> str:
-    """Generate the 'Current State' section."""
-    # Extract last few assistant messages for context
-    recent_work = data['assistant_messages'][-3:] if data['assistant_messages'] else []
-
+def append_current_state(data: Dict[str, Any], out: List[str]) -> None:
+    """Append the 'Current State' section to out."""
     # Count tool uses
     tool_count = len(data['tool_uses'])
-    error_count = len(data['errors'])
+    error_count = data['errors_count']
 
-    state = f"""**State:** Session with {tool_count} actions taken"""
+    out.append(f"**State:** Session with {tool_count} actions taken")
     if error_count > 0:
-        state += f" | **Errors:** {error_count} encountered"
+        out.append(f" | **Errors:** {error_count} encountered")
     else:
-        state += " | **Errors:** None"
-
-    state += f" | **Messages:** {len(data['user_messages'])} exchanges"
+        out.append(" | **Errors:** None")
 
-    return state
+    out.append(f" | **Messages:** {len(data['user_messages'])} exchanges")
 
-def generate_decisions_section(data: Dict[str, Any]) -> str:
-    """Generate the 'Key Decisions' collapsible section."""
-    decisions = []
+def append_decisions_section(data: Dict[str, Any], out: List[str]) -> None:
+    """Append the 'Key Decisions' collapsible section to out, one line per decision."""
+    found = False
 
     # Extract decisions from conversation
     # Look for patterns like "I chose X because Y" or "decided to use X"
     for msg in data['assistant_messages']:
-        if any(keyword in msg.lower() for keyword in ['chose', 'decided', 'selected', 'using', 'rejected']):
+        if _DECISION_RE.search(msg):
             # Truncate long messages
             snippet = msg[:200] + '...' if len(msg) > 200 else msg
-            decisions.append(f"- {snippet}")
+            out.append(f"- {snippet}\n")
+            found = True
 
-    if not decisions:
-        decisions.append("- No explicit decisions recorded in this session")
+    if not found:
+        out.append("- No explicit decisions recorded in this session\n")
 
-    return '\n'.join(decisions)
+def append_narrative_section(data: Dict[str, Any], out: List[str],
+                             max_messages: Optional[int] = None) -> None:
+    """
+    Append the 'Full Narrative' collapsible section to out, one line per message.
 
-def generate_narrative_section(data: Dict[str, Any]) -> str:
-    """Generate the 'Full Narrative' collapsible section."""
-    narrative = []
+    If max_messages is given, only the last max_messages user prompts and the
+    last max_messages assistant messages are formatted, preceded by a note
+    saying how many of each are shown.
+    """
+    user_messages = data['user_messages']
+    assistant_messages = data['assistant_messages']
+
+    # Trim each list on its own: sessions hold far more assistant text blocks
+    # than user prompts, so a shared offset would drop every prompt
+    user_skip = 0
+    assistant_skip = 0
+    if max_messages is not None:
+        user_skip = max(len(user_messages) - max_messages, 0)
+        assistant_skip = max(len(assistant_messages) - max_messages, 0)
+        if user_skip or assistant_skip:
+            out.append(
+                f"_Showing the last {len(user_messages) - user_skip} of {len(user_messages)} "
+                f"user messages and {len(assistant_messages) - assistant_skip} of "
+                f"{len(assistant_messages)} assistant messages; "
+                f"run with --full-narrative to include all of them._\n\n"
+            )
+
+    # Truncate very long messages up front rather than inside the interleave loop
+    limit = NARRATIVE_MAX_CHARS
+    shown_assistant = [
+        msg if len(msg) <= limit else f"{msg[:limit]}..."
+        for msg in islice(assistant_messages, assistant_skip, None)
+    ]
 
     # Interleave user and assistant messages chronologically
-    user_idx = 0
-    assistant_idx = 0
-
-    while user_idx < len(data['user_messages']) or assistant_idx < len(data['assistant_messages']):
-        if user_idx < len(data['user_messages']):
-            narrative.append(f"**User:** {data['user_messages'][user_idx]}")
-            user_idx += 1
-
-        if assistant_idx < len(data['assistant_messages']):
-            msg = data['assistant_messages'][assistant_idx]
-            # Truncate very long messages
-            if len(msg) > 500:
-                msg = msg[:500] + "..."
-            narrative.append(f"**Assistant:** {msg}")
-            assistant_idx += 1
-
-        narrative.append("")  # Empty line between exchanges
+    for user_msg, assistant_msg in zip_longest(islice(user_messages, user_skip, None), shown_assistant):
+        if user_msg is not None:
+            out.append(f"**User:** {user_msg}\n")
 
-    return '\n'.join(narrative)
+        if assistant_msg is not None:
+            out.append(f"**Assistant:** {assistant_msg}\n")
 
-def generate_markdown_summary(data: Dict[str, Any], timestamp: str) -> str:
-    """Generate the complete markdown summary in inverted pyramid format."""
+        out.append("\n")  # Empty line between exchanges
 
-    current_state = generate_current_state(data)
-    decisions = generate_decisions_section(data)
-    narrative = generate_narrative_section(data)
-
-    markdown = f"""# Session Summary: {timestamp}
+# Summary layout in inverted pyramid order. It is split once at import into
+# literal fragments and the section names between them, so each summary only
+# appends fragments and section output into one list instead of re-formatting
+# the whole template.
+_SUMMARY_TEMPLATE = """# Session Summary: {timestamp}
 
 <!-- Quick scan -->
-{current_state}
+{state}
 
 <details>
 <summary>📋 Key Decisions (click to expand)</summary>
 
 {decisions}
-
 </details>
 
 <details>
 <summary>📖 Full Narrative (click for details)</summary>
 
 {narrative}
-
 </details>
 
 ---
@@ -241,20 +324,48 @@ def generate_markdown_summary(data: Dict[str, Any], timestamp: str) -> str:
 *Generated automatically by session-summary from Claude Code session logs*
 """
 
-    return markdown
+_SUMMARY_LAYOUT = [
+    (literal, field)
+    for literal, field, _, _ in string.Formatter().parse(_SUMMARY_TEMPLATE)
+]
+
+def generate_markdown_summary(data: Dict[str, Any], timestamp: str,
+                              max_messages: Optional[int] = None) -> str:
+    """
+    Generate the complete markdown summary in inverted pyramid format.
+
+    Every section appends into one shared list, which is joined once at the end.
+    max_messages limits the narrative to the most recent messages of each kind.
+    """
+    parts = []
+    for literal, field in _SUMMARY_LAYOUT:
+        parts.append(literal)
+        if field == 'timestamp':
+            parts.append(timestamp)
+        elif field == 'state':
+            append_current_state(data, parts)
+        elif field == 'decisions':
+            append_decisions_section(data, parts)
+        elif field == 'narrative':
+            append_narrative_section(data, parts, max_messages)
+
+    return ''.join(parts)
 
 def save_summary(project_dir: str, markdown: str, timestamp: str) -> Path:
     """
     Save summary to .context/ directory and update symlink.
 
+    Paths are handled as plain strings internally; only the result is a Path.
+
     Returns:
         Path to the saved summary file
     """
-    context_dir = Path(project_dir) / '.context'
-    context_dir.mkdir(exist_ok=True)
+    context_dir = os.path.join(project_dir, '.context')
+    os.makedirs(context_dir, exist_ok=True)
 
     # Create timestamped filename
-    summary_file = context_dir / f"session-{timestamp}.md"
+    summary_name = f"session-{timestamp}.md"
+    summary_file = os.path.join(context_dir, summary_name)
 
     # Write summary
     with open(summary_file, 'w') as f:
@@ -263,20 +374,54 @@ def save_summary(project_dir: str, markdown: str, timestamp: str) -> Path:
     print(f"✅ Summary saved: {summary_file}")
 
     # Update symlink
-    symlink_path = context_dir / 'session-latest.md'
-
-    # Remove existing symlink if it exists
-    if symlink_path.exists() or symlink_path.is_symlink():
-        symlink_path.unlink()
-
-    # Create new symlink (relative to context_dir)
-    symlink_path.symlink_to(summary_file.name)
-    print(f"✅ Symlink updated: session-latest.md -> {summary_file.name}")
-
-    return summary_file
+    symlink_path = os.path.join(context_dir, 'session-latest.md')
+
+    # Create the new symlink (relative to context_dir) under a temporary name,
+    # then rename it over the old one so readers never see it missing
+    tmp_symlink = os.path.join(context_dir, f".session-latest.{os.getpid()}.tmp")
+    try:
+        # A crashed run with a reused PID may have left this name behind
+        os.unlink(tmp_symlink)
+    except FileNotFoundError:
+        pass
+    os.symlink(summary_name, tmp_symlink)
+    try:
+        os.replace(tmp_symlink, symlink_path)
+    except OSError:
+        os.unlink(tmp_symlink)
+        raise
+    print(f"✅ Symlink updated: session-latest.md -> {summary_name}")
+
+    return Path(summary_file)
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(
+        description="Generate a session summary from Claude Code session logs."
+    )
+    parser.add_argument(
+        '--full-narrative',
+        action='store_true',
+        help="include every message in the Full Narrative section",
+    )
+    parser.add_argument(
+        '--max-narrative-messages',
+        type=int,
+        default=NARRATIVE_DEFAULT_MESSAGES,
+        metavar='N',
+        help=f"user and assistant messages each to keep in the narrative "
+             f"without --full-narrative (default: {NARRATIVE_DEFAULT_MESSAGES})",
+    )
+    args = parser.parse_args()
+    if args.max_narrative_messages < 0:
+        parser.error("--max-narrative-messages must not be negative")
+    return args
 
 def main():
     """Main entry point."""
+    args = parse_args()
+    max_messages = None if args.full_narrative else args.max_narrative_messages
+
     print("🔍 Generating session summary...")
 
     # Get project directory
@@ -304,7 +449,7 @@ def main():
     timestamp = datetime.now().strftime("%Y-%m-%d-%H%M")
 
     # Generate markdown
-    markdown = generate_markdown_summary(data, timestamp)
+    markdown = generate_markdown_summary(data, timestamp, max_messages)
 
     # Save summary
     summary_file = save_summary(project_dir, markdown, timestamp)